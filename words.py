@@ -1,8 +1,62 @@
 import os
 import re
 import argparse
+import functools
+import itertools
+
+# Use Google's RE2 engine for the crossword scans if it is installed.  RE2
+# guarantees linear-time matching and is faster on the large joined buffers
+# we scan, but it is an optional extra - the standard re module works fine.
+try:
+    import re2 as re_engine
+except ImportError:
+    re_engine = re
 
 LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+# A set of the letters for O(1) membership tests in the per-character loops
+LETTER_SET = frozenset(LETTERS)
+# The bytes we accept in a dictionary word - deleting these from a word
+# with bytes.translate() leaves only the invalid characters behind
+ALLOWED_BYTES = (LETTERS + LETTERS.upper()).encode()
+# Translation table that lowercases ASCII bytes.  bytes.translate() with
+# this table is much quicker than str.lower(), which has to consult the
+# Unicode tables, and our words are plain ASCII
+LOWER_TABLE = bytes.maketrans(LETTERS.upper().encode(), LETTERS.encode())
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(pattern):
+    '''
+    Compile a search pattern, caching the result
+
+    Users often repeat or refine the same patterns during an interactive
+    session, so caching the compiled form keeps regex construction out of
+    the search path.  Flags must be embedded in the pattern itself (as
+    _crossword_pattern does with (?m)) because re2's compile() does not
+    accept the stdlib flag constants.
+    '''
+    return re_engine.compile(pattern)
+
+
+@functools.lru_cache(maxsize=1024)
+def _crossword_pattern(word):
+    '''
+    Build the anchored crossword regex for a lowercased search term
+
+    Letters match themselves and anything else becomes a single-letter
+    wildcard.  The multiline flag goes inline so the pattern works with
+    either regex engine.  Cached per query string so retyped queries skip
+    the character loop as well as recompilation.
+    '''
+    pattern = ''
+    for letter in word:
+        if letter in LETTER_SET:
+            # match the letter itself
+            pattern += letter
+        else:
+            # match any letter
+            pattern += '.'
+    return '(?m)^' + pattern + '$'
 
 
 class words:
@@ -64,50 +118,93 @@ class words:
         HELLO
               ''')
 
-    def add_word(self, word):
+    def add_word(self, word, norm=None):
         '''
         Add a word to the index
 
         Args:
             word (str):  The word to be indexed
+            norm:  The precomputed index key for the word, if the caller
+                   already has it (as load_words() does).  If None the key
+                   is computed here.
 
         Returns:
             self
         '''
-        # Normalise the word according to the class rules
-        norm = self.normalise(word)
-        # Add the word to the index with a key of the normalised word
-        if norm in self.word_index:
-            # Depending on the normalisation we may have multiple words woth
-            # the same index key, so we need to store a list of words...
-            self.word_index[norm].append(word)
-        else:
-            self.word_index[norm] = [word]
+        if norm is None:
+            # Normalise the word according to the class rules
+            norm = self.normalise(word)
+        # Add the word to the index with a key of the normalised word.
+        # Depending on the normalisation we may have multiple words woth
+        # the same index key, so we store a list of words, and setdefault
+        # gives us the list in a single dict operation whether or not the
+        # key already exists
+        self.word_index.setdefault(norm, []).append(word)
         return self
 
     def normalise(self, word):
         '''
         Normalise the word before indexing
 
-        This function should return a tuple of the word itself and its index
-        under the indexing scheme.  This function should be overridden by child
-        classes as it is this which determines the key for the word index.
+        Cleans up an arbitrary input string and hands it to
+        _normalise_bytes(), which builds the actual index key.  Child
+        classes should override _normalise_bytes() as it is that which
+        determines the key for the word index.
 
         Args:
             word (str): The word to be normalised
 
         Returns:
-            (str): A normalised version of the word to be used as the index key
+            The index key for the word
+        '''
+
+        # A simple normalisation - lowercase via the cached ASCII table
+        # rather than str.lower(), which is slower because it has to handle
+        # the full Unicode case rules, then hand the clean bytes to the
+        # class's key builder
+        if word.isascii():
+            return self._normalise_bytes(word.strip().encode('ascii')
+                                         .translate(LOWER_TABLE))
+        # Non-ASCII input can't take the bytes shortcut without dropping or
+        # corrupting characters, so lowercase with the full Unicode rules
+        # and use a length-preserving byte form instead
+        return self._normalise_bytes(word.lower().strip()
+                                     .encode('latin-1', 'replace'))
+
+    def _normalise_bytes(self, buf):
+        '''
+        Build the index key from an already lowercased bytes word
+
+        This is the per-class half of normalisation.  normalise() cleans up
+        an arbitrary string and calls this, while load_words() calls it
+        directly with bytes it has already validated and lowercased so each
+        word only gets one cleaning pass at load time.
+
+        Args:
+            buf (bytes): The lowercased word, one byte per character
+
+        Returns:
+            The index key for the word
+        '''
+        return buf.decode('latin-1')
+
+    def _reset_index(self):
         '''
+        Clear the word index ready for a fresh load
 
-        # A simple normalisation
-        return word.lower().strip()
+        Child classes that keep extra state derived from the index should
+        override this to clear that state as well, so reloading a word list
+        cannot leave anything stale behind.
+        '''
+        self.word_index = {}
 
     def load_words(self, filename, reset=True):
         '''
         Load reference word list from a file
 
-        File should contain a single word per line
+        File should contain a single word per line.  Words are split on any
+        whitespace, so blank lines are skipped and a line holding several
+        words indexes each of them rather than being reported.
 
         Args:
             filename (str): location of the wordlist to use
@@ -119,35 +216,37 @@ class words:
 
         if reset:
             # Start with an empty word list
-            self.word_index = {}
+            self._reset_index()
         # Get the full path to the word file
         path = os.path.abspath(filename)
         # we will count how many words we index
         count = 0
-        lines = 1
         # Check that the word file exists
         if os.path.exists(path):
-            with open(path, 'r') as f:
-                for line in f:
-                    # Get the word from the file
-                    w = line.strip()
-                    # Check we only have one word on the line
-                    words = w.split()
-                    if len(words) > 1:
-                        print("Multiple words (" +
-                              w + ") found in line " + str(lines))
-                    # Check for blank lines
-                    elif w == '':
-                        print("Blank line in word file:  " + str(lines))
-                    # Check for non letter characters
-                    elif any(char not in LETTERS for char in w.lower()):
-                        print("Found non letter character in " +
-                              w + " on line " + str(lines))
-                    else:
-                        # Add the word to the index
-                        self.add_word(w)
-                        count += 1
-                    lines += 1
+            # Read the whole file in one go as bytes and let split() cut it
+            # into words at C speed rather than iterating the file object
+            # line by line and stripping each line - splitting on whitespace
+            # also drops blank lines for free
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Bind the per-word methods to locals so the hot loop skips the
+            # attribute lookups on every word
+            add_word = self.add_word
+            normalise_bytes = self._normalise_bytes
+            for w in data.split():
+                # Check for non letter characters - deleting every allowed
+                # letter leaves an empty result for a valid word, and it is
+                # a single C call instead of a Python loop per character
+                if w.translate(None, ALLOWED_BYTES):
+                    print("Found non letter character in " +
+                          w.decode(errors='replace'))
+                else:
+                    # The word is known-valid so lowercase it once and build
+                    # the index key straight from the bytes, saving add_word
+                    # a full normalisation pass per word
+                    add_word(w.decode('ascii'),
+                             normalise_bytes(w.translate(LOWER_TABLE)))
+                    count += 1
             print("Loaded " + str(count) + " words")
         return self
 
@@ -197,24 +296,83 @@ class anagram(words):
         TOPS
               ''')
 
-    def normalise(self, word):
+    def _normalise_bytes(self, buf):
         '''
-        Normalise the word for anagram matching
-
-        To match anagrams we create a tuple of all of the letters in the word
-        sorted alphabetically, then any word containing the same letters will
-        normalise to the same value which is our index lookup...
+        Build the anagram key from an already lowercased bytes word
+
+        To match anagrams we count how many times each letter appears in the
+        word, then any word containing the same letters will normalise to the
+        same value which is our index lookup...  Counting is a single pass
+        over the word, which is cheaper than sorting the letters, and the 26
+        counts are packed into one small bytes object - no letter repeats
+        anywhere near 255 times in a real word, so a byte per count is
+        plenty, and bytes keys hash at C speed.  Counts are capped at 255
+        so that arbitrary search input cannot overflow a byte - a capped
+        count can never match a real word anyway.
         '''
 
-        word = super().normalise(word)
-        letters = []
-        for letter in word:
-            letters.append(letter)
-        return tuple(sorted(letters))
+        counts = bytearray(26)
+        extras = bytearray()
+        for byte in buf:
+            if 97 <= byte <= 122:
+                if counts[byte - 97] < 255:
+                    counts[byte - 97] += 1
+            else:
+                # A non-letter can never appear in an indexed word, so keep
+                # it in the key to stop the query matching real words
+                extras.append(byte)
+        if extras:
+            # Sorted so the same mix of characters still matches itself
+            return bytes(counts) + bytes(sorted(extras))
+        return bytes(counts)
 
 
 class crossword(words):
 
+    def __init__(self, word_index=None):
+        super().__init__(word_index)
+        # Index keys grouped by word length so a search only has to scan
+        # words of the right length
+        self._by_len = {}
+        # Cached newline-joined views of the per-length buckets used by
+        # search().  Built lazily on first search and invalidated when a
+        # word of that length is added.
+        self._joined_by_len = {}
+        # If we were given a ready-made index, derive its length buckets
+        # so search() sees the supplied words
+        for norm in self.word_index:
+            self._by_len.setdefault(len(norm), []).append(norm)
+
+    def _reset_index(self):
+        '''
+        Clear the word index along with the length buckets
+        '''
+        super()._reset_index()
+        self._by_len = {}
+        self._joined_by_len = {}
+
+    def add_word(self, word, norm=None):
+        '''
+        Add a word to the index
+
+        We also add the index key to its length bucket and drop the cached
+        joined view of that bucket so the next search rebuilds it with the
+        new word included.
+        '''
+        if norm is None:
+            norm = self.normalise(word)
+        if norm in self.word_index:
+            self.word_index[norm].append(word)
+        else:
+            self.word_index[norm] = [word]
+            # A new key, so remember it in its length bucket
+            if len(norm) in self._by_len:
+                self._by_len[len(norm)].append(norm)
+            else:
+                self._by_len[len(norm)] = [norm]
+            self._joined_by_len.pop(len(norm), None)
+        return self
+
     def help_text(self):
         '''
         Print help for the word matcher
@@ -241,37 +399,99 @@ class crossword(words):
 
         Crossword search is long winded as we must look at each entry in the
         index to see whether we match it.  There is no easy lookup we can
-        perform to narrow down the search space, so this search gets much
-        slower with larger word lists
+        perform to narrow down the search space, but the length of the
+        search term tells us which length bucket to look in, and rather than
+        calling the matcher once per indexed word from Python we join the
+        bucket's keys into a single newline-separated string and let the
+        regex engine scan the whole thing in one call
         '''
 
-        # Build a regex incrementally from the incoming search term
-        pattern = ''
-        for letter in word.lower():
-            if letter in LETTERS:
-                # match the letter itself
-                pattern += letter
+        word = word.lower()
+        # Find where the blanks are in the search term
+        blanks = [i for i, letter in enumerate(word)
+                  if letter not in LETTER_SET]
+        # If there are no blanks in the search term then it is a complete
+        # word and we can look it up in the index directly rather than
+        # scanning for it
+        if not blanks:
+            if word in self.word_index:
+                return [self.word_index[word][0]]
             else:
-                # match any letter
-                pattern += '.'
-        # Compile the search pattern to speed up matching
-        matcher = re.compile(pattern)
+                return []
+        # With only a couple of blanks it is cheaper to try every letter in
+        # the blank positions and probe the index for each candidate (at
+        # most 26 * 26 dict lookups) than to regex-scan a whole bucket
+        if len(blanks) <= 2:
+            letters = list(word)
+            hits = []
+            for combo in itertools.product(LETTERS, repeat=len(blanks)):
+                for position, letter in zip(blanks, combo):
+                    letters[position] = letter
+                candidate = ''.join(letters)
+                if candidate in self.word_index:
+                    hits.append(self.word_index[candidate][0])
+            return hits
+        # We only ever scan words of the right length
+        length = len(word)
+        if length not in self._by_len:
+            # No indexed words of this length so there can be no matches
+            return []
+        # Get the anchored regex for the search term and fetch the compiled
+        # form, both from their caches
+        matcher = _compile(_crossword_pattern(word))
+        # Lazily build the joined view of the length bucket
+        if length not in self._joined_by_len:
+            self._joined_by_len[length] = '\n'.join(self._by_len[length])
         # Create an empty list for our matches
         hits = []
-        # Loop over all of the indexed words
-        for word in self.word_index:
-            # See if it could be a match
-            result = matcher.fullmatch(word)
-            if result:
-                # If it is then ad it to our matches
-                # Because of how we are indexing there should only be one word
-                # match per index entry so use the first word word[0]
-                hits.append(self.word_index[word][0])
+        # Scan the whole bucket in a single call into the regex engine
+        for match in matcher.finditer(self._joined_by_len[length]):
+            # Because of how we are indexing there should only be one word
+            # match per index entry so use the first word
+            hits.append(self.word_index[match.group(0)][0])
         return hits
 
 
 class codeword(words):
 
+    def __init__(self, word_index=None):
+        super().__init__(word_index)
+        # Lowercased byte versions of the indexed words, keyed like
+        # word_index, so search() can compare candidates without
+        # re-lowercasing and re-encoding them on every query
+        self._encoded = {}
+        # The word lengths we have indexed, so search() can bail out
+        # before doing any work when no word of that length exists
+        self._lengths = set()
+        # If we were given a ready-made index, derive the byte copies and
+        # the lengths from the words it holds so search() can use them
+        for norm, entries in self.word_index.items():
+            self._encoded[norm] = [w.lower().encode() for w in entries]
+            self._lengths.add(len(norm))
+
+    def _reset_index(self):
+        '''
+        Clear the word index along with the derived search state
+        '''
+        super()._reset_index()
+        self._encoded = {}
+        self._lengths = set()
+
+    def add_word(self, word, norm=None):
+        '''
+        Add a word to the index
+
+        As well as the normal index entry we store a lowercased bytes copy
+        of the word for the fast letter comparison in search() and note the
+        word's length.
+        '''
+        if norm is None:
+            norm = self.normalise(word)
+        self.word_index.setdefault(norm, []).append(word)
+        self._encoded.setdefault(norm, []).append(word.lower().encode())
+        self._lengths.add(len(norm))
+        return self
+
     def help_text(self):
         '''
         Print help for the word matcher
@@ -299,9 +519,9 @@ class codeword(words):
 
               ''')
 
-    def normalise(self, word):
+    def _normalise_bytes(self, buf):
         '''
-        Normalise word for codeword matching
+        Build the codeword key from an already lowercased bytes word
 
         With codewords we have a bit more knowledge of the problem.  We know
         where letters are the same and where they are different because of
@@ -314,55 +534,67 @@ class codeword(words):
         fully...
         '''
 
-        # Strip and lowercase the incoming word
-        word = super().normalise(word)
-        # Start with a blank code
-        code = []
-        # Keep track of the letters we have already seen
+        # Preallocate the code - we know its length up front, so there is
+        # no per-letter growth to pay for
+        code = bytearray(len(buf))
+        # Keep track of the letters we have already seen.  setdefault does
+        # the lookup and the insert for a new letter in one dict operation,
+        # so the loop body is branch-free apart from bumping the counter
         letters_seen = {}
-        # The number we are going to use for the next unique letter
-        next_letter = 1
+        assign = letters_seen.setdefault
+        # The highest letter number we have handed out so far
+        highest = 0
         # Loop over the letters in the word to create the code
-        for letter in word:
-            if letter not in letters_seen:
-                # Add it and keep track of its number
-                letters_seen[letter] = next_letter
-                # Increment the code for the next unique letter
-                next_letter += 1
-            # Add the letter code to our list of letter codes
-            code.append(letters_seen[letter])
-        # Return a tuple as we will use it as a key to the index
-        # Lists cannot be used as keys
-        return tuple(code)
+        for i, letter in enumerate(buf):
+            number = assign(letter, highest + 1)
+            if number > highest:
+                # It was a new letter and took the next number
+                highest = number
+            code[i] = number
+        # Each code fits in a byte (a word never has more than 26 unique
+        # letters) so return the codes as a bytes object - it is hashable
+        # like a tuple but far smaller and faster to hash as an index key
+        return bytes(code)
 
     def search(self, word):
         # We have no matches so far...
         matches = None
+        # If no indexed word has this length then there is nothing to find
+        # and we can skip building the code for the search word entirely
+        if len(word.strip()) not in self._lengths:
+            return matches
         # Normalise the search word to get the code
         norm = self.normalise(word)
         # Check to see whether we have the code in the index
         if norm in self.word_index:
-            # We do so get the possible matches
+            # We do so get the possible matches and their byte versions
             possibles = self.word_index[norm]
+            encoded = self._encoded[norm]
+            # Work out once which positions in the search word are known
+            # letters
+            positions = [i for i, letter in enumerate(word)
+                         if letter in LETTER_SET]
             # We must have at lease one hit so we are going to return a list
             matches = []
-            # Loop over all possible matches
-            for w in possibles:
-                # Assume match until we find out differently
-                failed = False
-                # Loop over each letter in the word
-                for i in range(len(word)):
-                    # Is it a letter?
-                    if word[i] in LETTERS:
-                        # Is it the same as the letter in the possible match?
-                        if word[i].lower() != w[i].lower():
-                            # It isn't so let's get out of here
-                            failed = True
-                            break
-                # If it matched all letters that we know about
-                if not failed:
-                    # Add it to our matches
-                    matches.append(w)
+            if word.isascii():
+                # One byte per character, so the positions index straight
+                # into the encoded words and we can compare just the known
+                # letters with one bytes comparison per candidate
+                lowered = word.lower().encode()
+                template = bytes(lowered[i] for i in positions)
+                for w, wb in zip(possibles, encoded):
+                    if bytes(wb[i] for i in positions) == template:
+                        # It matched all letters that we know about
+                        matches.append(w)
+            else:
+                # A non-ASCII blank would throw the byte offsets out of
+                # line with the character positions, so compare the known
+                # letters character by character instead
+                lowered = word.lower()
+                for w in possibles:
+                    candidate = w.lower()
+                    if all(candidate[i] == lowered[i] for i in positions):
+                        matches.append(w)
         return matches
 
 
@@ -382,7 +614,13 @@ class cryptic(anagram):
         # Generate an index referenced by word length
         self._by_length = {}
 
-    def add_word(self, word):
+    def _normalise_bytes(self, buf):
+        '''
+        The length index doesn't use normalised keys, so skip building one
+        '''
+        return None
+
+    def add_word(self, word, norm=None):
         '''
         We need a different type of index...
         '''
@@ -483,6 +721,10 @@ def main():
         parser.exit()
 
     results = []
+    # Remember the last search so an accidental double-enter of the same
+    # query reuses the previous results instead of searching again
+    last_search = None
+    last_results = None
     # Allow user to search interactively
     again = True
     # Loop until we want to exit
@@ -510,9 +752,14 @@ def main():
             # If they just hit return signal quit
             if search_word == "":
                 again = False
+            elif search_word == last_search:
+                # Same query as last time so reuse its results
+                results = last_results
             else:
                 # Perform the search
                 results = indx.search(search_word)
+                last_search = search_word
+                last_results = results
         if results is None or len(results) == 0:
             print("Nothing found!")
         else: